@@ -1,10 +1,15 @@
 # Solution.py
 # This file contains the implementation of our solution for the vehicle routing problem
 # We use a simple local search approach with 2-opt moves to improve the initial solution
+# and then an ALNS (see alns.py) to make bigger changes within a time budget
+# A tabu search (see tabu_search.py) can be used instead with engine="tabu"
 
 import random
 import time
 from initial_solution import initial_solution
+from alns import alns
+from reduction import reduce_model, map_routes
+from tabu_search import tabu_search
 from Parser import load_model
 from SolutionValidator import validate_solution
 
@@ -168,16 +173,36 @@ def local_search(model, routes, max_iterations=100):
     return best_routes, best_cost
 
 # Main function to generate and save the solution
-def generate_solution(instance_file, solution_file):
+def generate_solution(instance_file, solution_file, time_limit=5.0, reduce=False, engine="alns"):
+    if engine not in ("alns", "tabu"):
+        raise ValueError(f"Unknown engine '{engine}', expected 'alns' or 'tabu'")
+
     model = load_model(instance_file)
+
+    # Optionally drop family members that are unlikely to be visited
+    id_map = None
+    if reduce:
+        model, id_map = reduce_model(model)
+
     initial_routes = initial_solution(model)
     
     # Merge routes if needed
     if len(initial_routes) > model.vehicles:
         initial_routes = merge_routes(model, initial_routes)
     
-    # Improve solution with local search
-    improved_routes, solution_cost = local_search(model, initial_routes)
+    if engine == "tabu":
+        # Improve solution with tabu search for the whole time budget
+        improved_routes, solution_cost = tabu_search(model, initial_routes, time_limit=time_limit)
+    else:
+        # Improve solution with local search
+        improved_routes, solution_cost = local_search(model, initial_routes)
+
+        # Make larger changes with ALNS within the time budget
+        improved_routes, solution_cost = alns(model, improved_routes, time_limit=time_limit)
+
+    # Go back to the node IDs of the original instance
+    if id_map is not None:
+        improved_routes = map_routes(improved_routes, id_map)
     
     # Save solution to file
     with open(solution_file, 'w') as f:
@@ -187,4 +212,5 @@ def generate_solution(instance_file, solution_file):
     return improved_routes
 
 # Generate solution when the file is run
-generate_solution("fcvrp_P-n101-k4_10_3_3.txt", "solution_example.txt")
\ No newline at end of file
+if __name__ == "__main__":
+    generate_solution("fcvrp_P-n101-k4_10_3_3.txt", "solution_example.txt")
\ No newline at end of file
@@ -0,0 +1,288 @@
+# alns.py
+# This file contains an Adaptive Large Neighbourhood Search (ALNS) for the F-CVRP
+# Every iteration destroys part of the solution and repairs it again, so it can make
+# much bigger changes than the 2-opt moves in Solution.py. The operators that work
+# well get picked more often as the search goes on.
+
+import itertools
+import math
+import random
+import time
+from route_state import RouteState, arc_cost, removal_cost
+
+# Scores given to an operator pair depending on what its iteration achieved
+SCORE_NEW_BEST = 33
+SCORE_IMPROVED = 9
+SCORE_ACCEPTED = 13
+
+
+# The state that destroy and repair operators work on (see route_state.py).
+# Every route also has a stamp that changes whenever the route changes. The
+# best insertion of a node into a route is cached together with the stamp it
+# was computed for, so it stays valid until that route is touched again. The
+# stamp counter and the cache are shared by all copies of a state, so routes a
+# destroy/repair iteration did not touch keep their cached insertions.
+class AlnsState(RouteState):
+    def __init__(self, model, routes):
+        super().__init__(model, routes)
+        self.counter = itertools.count()
+        self.stamps = [next(self.counter) for _ in self.routes]
+        self.insertion_cache = {}
+
+    def copy(self):
+        new_state = super().copy()
+        new_state.counter = self.counter
+        new_state.stamps = self.stamps.copy()
+        new_state.insertion_cache = self.insertion_cache
+        return new_state
+
+    # Mark a route as changed so its cached insertions are recomputed
+    def touch(self, route_idx):
+        self.stamps[route_idx] = next(self.counter)
+
+
+# ---------------------------------------------------------------------------
+# Destroy operators: each one gets the state, how many nodes to remove and a
+# random generator, and takes the nodes out of the state
+# ---------------------------------------------------------------------------
+
+# Remove random customers
+def random_removal(state, amount, rng):
+    nodes = [node for _, _, node in state.positions()]
+    state.remove_nodes(rng.sample(nodes, min(amount, len(nodes))))
+
+
+# Remove the customers that cost us the most, with some randomness so we do
+# not always pick the same ones
+def worst_removal(state, amount, rng, randomness=3):
+    for _ in range(amount):
+        positions = state.positions()
+        if not positions:
+            return
+        positions.sort(key=lambda p: removal_cost(state.model, state.routes[p[0]], p[1]))
+        route_idx, pos, _ = positions[int(len(positions) * rng.random() ** randomness)]
+        state.remove(route_idx, pos)
+
+
+# Shaw removal: start from a random customer and keep removing the customers
+# closest (by cost_matrix) to the ones we already removed
+def related_removal(state, amount, rng, randomness=6):
+    cost_matrix = state.model.cost_matrix
+    remaining = [node for _, _, node in state.positions()]
+    if not remaining:
+        return
+    removed = [remaining.pop(rng.randrange(len(remaining)))]
+    while remaining and len(removed) < amount:
+        seed = rng.choice(removed)
+        remaining.sort(key=lambda node: cost_matrix[seed][node])
+        removed.append(remaining.pop(int(len(remaining) * rng.random() ** randomness)))
+    state.remove_nodes(removed)
+
+
+# Remove every visited member of one or more random families, so the repair
+# can rebuild them with different members
+def family_removal(state, amount, rng):
+    families = list({state.model.nodes[node].family for node in state.visited})
+    rng.shuffle(families)
+    removed = []
+    for family in families:
+        if len(removed) >= amount:
+            break
+        removed.extend(node for node in state.visited if state.model.nodes[node].family == family)
+    state.remove_nodes(removed)
+
+
+# ---------------------------------------------------------------------------
+# Repair operators: put customers back until every family has its required
+# visits again. They return False if the capacity makes that impossible.
+# ---------------------------------------------------------------------------
+
+# Costs of the arcs of a route, cached with the stamp of the route
+def route_arcs(state, route_idx):
+    stamp = state.stamps[route_idx]
+    cached = state.insertion_cache.get(route_idx)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    route = state.routes[route_idx]
+    arcs = [arc_cost(state.model, route[i], route[i + 1]) for i in range(len(route) - 1)]
+    state.insertion_cache[route_idx] = (stamp, arcs)
+    return arcs
+
+
+# Best (cost, pos) for putting node into route route_idx, or None if it does not fit
+def best_insertion_in_route(state, route_idx, node):
+    key = (node, route_idx)
+    stamp = state.stamps[route_idx]
+    cached = state.insertion_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    best = None
+    if state.loads[route_idx] + state.model.nodes[node].demand <= state.model.capacity:
+        row = state.model.cost_matrix[node]
+        route = state.routes[route_idx]
+        costs = [row[prev_node] + row[next_node] - arc
+                 for prev_node, next_node, arc in zip(route, route[1:], route_arcs(state, route_idx))]
+        cost = min(costs)
+        best = (cost, costs.index(cost) + 1)
+
+    state.insertion_cache[key] = (stamp, best)
+    return best
+
+
+# Unvisited members of the families that still need visits
+def insertion_candidates(state):
+    candidates = []
+    for family_id in state.deficient_families():
+        for node in state.model.families[family_id].nodes:
+            if node.id not in state.visited:
+                candidates.append(node.id)
+    return candidates
+
+
+# Shared loop for greedy and regret repair. Insertions come from the cache
+# on the state, so only routes that changed since the last lookup are scanned.
+def _repair(state, rng, k):
+    candidates = set(insertion_candidates(state))
+    num_routes = len(state.routes)
+
+    while True:
+        deficient = set(state.deficient_families())
+        if not deficient:
+            return True
+
+        # For every family that still needs visits, find its cheapest
+        # insertion into every route (over all its candidate members)
+        best_choice = None
+        best_key = None
+        for family_id in deficient:
+            route_best = [None] * num_routes
+            for node in state.model.families[family_id].nodes:
+                if node.id not in candidates:
+                    continue
+                for route_idx in range(num_routes):
+                    option = best_insertion_in_route(state, route_idx, node.id)
+                    if option is not None and (route_best[route_idx] is None
+                                               or option[0] < route_best[route_idx][0]):
+                        route_best[route_idx] = (option[0], route_idx, option[1], node.id)
+            options = sorted(option for option in route_best if option is not None)
+            if not options:
+                return False
+            if k > 1:
+                # Regret: how much we lose if we do not take the best route now.
+                # A route where the family does not fit counts as infinitely
+                # expensive, so families with few places left go first.
+                regret = 0
+                for i in range(1, min(k, num_routes)):
+                    if i >= len(options):
+                        regret = math.inf
+                        break
+                    regret += options[i][0] - options[0][0]
+                key = (-regret, options[0][0], rng.random())
+            else:
+                key = (options[0][0], rng.random())
+            if best_key is None or key < best_key:
+                best_key = key
+                best_choice = options[0]
+
+        _, route_idx, pos, node = best_choice
+        state.insert(route_idx, pos, node)
+        candidates.discard(node)
+
+
+# Insert the cheapest customer first
+def greedy_repair(state, rng):
+    return _repair(state, rng, 1)
+
+
+# Insert the customer we would regret most not inserting now
+def regret2_repair(state, rng):
+    return _repair(state, rng, 2)
+
+
+def regret3_repair(state, rng):
+    return _repair(state, rng, 3)
+
+
+DESTROY_OPERATORS = [random_removal, worst_removal, related_removal, family_removal]
+REPAIR_OPERATORS = [greedy_repair, regret2_repair, regret3_repair]
+
+
+# Pick an index with probability proportional to its weight
+def roulette(weights, rng):
+    pick = rng.random() * sum(weights)
+    for idx, weight in enumerate(weights):
+        pick -= weight
+        if pick <= 0:
+            return idx
+    return len(weights) - 1
+
+
+# Main ALNS function
+def alns(model, routes, time_limit=5.0, min_remove=5, max_remove=20,
+         segment_length=100, reaction=0.1, start_temperature=0.02, seed=42):
+    rng = random.Random(seed)
+    start_time = time.time()
+
+    current = AlnsState(model, routes)
+    best = current.copy()
+
+    destroy_weights = [1.0] * len(DESTROY_OPERATORS)
+    repair_weights = [1.0] * len(REPAIR_OPERATORS)
+    destroy_scores = [0.0] * len(DESTROY_OPERATORS)
+    repair_scores = [0.0] * len(REPAIR_OPERATORS)
+    destroy_uses = [0] * len(DESTROY_OPERATORS)
+    repair_uses = [0] * len(REPAIR_OPERATORS)
+
+    # Simulated annealing acceptance: start by accepting solutions a few
+    # percent worse and cool down to zero at the end of the time budget
+    temperature_0 = max(1.0, current.cost * start_temperature)
+
+    # Nothing to destroy and repair if no customer needs a visit
+    if not current.visited:
+        return best.solution(), best.cost
+
+    iteration = 0
+    while time.time() - start_time < time_limit:
+        iteration += 1
+        d = roulette(destroy_weights, rng)
+        r = roulette(repair_weights, rng)
+
+        candidate = current.copy()
+        num_visited = len(candidate.visited)
+        amount = rng.randint(min(min_remove, num_visited), min(max_remove, num_visited))
+        DESTROY_OPERATORS[d](candidate, amount, rng)
+        repaired = REPAIR_OPERATORS[r](candidate, rng)
+
+        score = 0
+        if repaired:
+            elapsed = (time.time() - start_time) / time_limit
+            temperature = temperature_0 * max(0.0, 1.0 - elapsed)
+            if candidate.cost < best.cost:
+                best = candidate.copy()
+                current = candidate
+                score = SCORE_NEW_BEST
+            elif candidate.cost < current.cost:
+                current = candidate
+                score = SCORE_IMPROVED
+            elif temperature > 0 and rng.random() < math.exp((current.cost - candidate.cost) / temperature):
+                current = candidate
+                score = SCORE_ACCEPTED
+
+        destroy_scores[d] += score
+        repair_scores[r] += score
+        destroy_uses[d] += 1
+        repair_uses[r] += 1
+
+        # Adapt the weights at the end of every segment
+        if iteration % segment_length == 0:
+            for weights, scores, uses in ((destroy_weights, destroy_scores, destroy_uses),
+                                          (repair_weights, repair_scores, repair_uses)):
+                for idx in range(len(weights)):
+                    if uses[idx] > 0:
+                        weights[idx] = (1 - reaction) * weights[idx] + reaction * scores[idx] / uses[idx]
+                    weights[idx] = max(weights[idx], 0.01)
+                    scores[idx] = 0.0
+                    uses[idx] = 0
+
+    return best.solution(), best.cost
@@ -68,4 +68,5 @@ def main(instance_file, solution_file):
 
 # Run the program with our test files
 if __name__ == "__main__":
+    Solution.generate_solution("fcvrp_P-n101-k4_10_3_3.txt", "solution_example.txt")
     main("fcvrp_P-n101-k4_10_3_3.txt", "solution_example.txt")
\ No newline at end of file
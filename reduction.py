@@ -0,0 +1,80 @@
+# reduction.py
+# This file shrinks a parsed Model before we solve it
+# Many families have a lot more members than the visits they need, and the
+# members far away from everything else are almost never part of a good
+# solution. We rank the members of every family with a few cheap scores and
+# only keep the best ones, so every later stage has fewer candidates to try.
+# This is a heuristic: it can throw away a member that the optimal solution uses.
+
+import math
+from Parser import Model, create_nodes_families
+
+
+# Cost of the k cheapest arcs from node to members of other families
+def k_nearest_cost(model, node, k):
+    costs = sorted(model.cost_matrix[node.id][other.id] for other in model.customers
+                   if other.family != node.family)
+    return sum(costs[:k])
+
+
+# Rough estimate of what node adds to a route: every visited node has one arc
+# in and one arc out, so we take half of its two cheapest arcs (the depot
+# included). This is a heuristic score, not a lower bound. A real insertion
+# lower bound, min c(p, node) + c(node, q) - c(p, q), is -1 or 0 for almost
+# every node because the rounded costs break the triangle inequality, so it
+# cannot tell members apart.
+def half_two_cheapest_arcs(model, node):
+    costs = sorted(model.cost_matrix[node.id][other.id] for other in model.nodes
+                   if other.id != node.id)
+    return (costs[0] + costs[1]) / 2
+
+
+# Rank the members of a family, best first. Every score is turned into a rank
+# inside the family so they can be added up without worrying about scale.
+# Members with the same value get the same rank.
+def rank_family_members(model, family, k=5, weights=(1.0, 1.0, 1.0)):
+    scores = [
+        {node.id: model.cost_matrix[0][node.id] for node in family.nodes},
+        {node.id: k_nearest_cost(model, node, k) for node in family.nodes},
+        {node.id: half_two_cheapest_arcs(model, node) for node in family.nodes},
+    ]
+
+    score = {node.id: 0.0 for node in family.nodes}
+    for weight, member_scores in zip(weights, scores):
+        values = sorted(member_scores.values())
+        for node_id, value in member_scores.items():
+            score[node_id] += weight * values.index(value)
+
+    return sorted(family.nodes, key=lambda node: (score[node.id], node.id))
+
+
+# Main reduction function: returns a smaller Model and id_map, where
+# id_map[new_id] is the node ID in the original model
+def reduce_model(model, keep_ratio=1.3, slack=2, k=5):
+    kept = []
+    for family in model.families:
+        keep = max(family.required_visits + slack, math.ceil(family.required_visits * keep_ratio))
+        ranked = rank_family_members(model, family, k)
+        # Keep the original order so the families stay contiguous in the new model
+        kept.extend(sorted(node.id for node in ranked[:keep]))
+
+    id_map = [0] + kept
+
+    reduced = Model()
+    reduced.num_nodes = len(kept)
+    reduced.num_fam = model.num_fam
+    reduced.num_req = model.num_req
+    reduced.capacity = model.capacity
+    reduced.vehicles = model.vehicles
+    reduced.fam_members = [sum(1 for node_id in kept if model.nodes[node_id].family == family.id)
+                           for family in model.families]
+    reduced.fam_req = list(model.fam_req)
+    reduced.fam_dem = list(model.fam_dem)
+    reduced.cost_matrix = [[model.cost_matrix[i][j] for j in id_map] for i in id_map]
+
+    return create_nodes_families(reduced), id_map
+
+
+# Translate routes of the reduced model back to the original node IDs
+def map_routes(routes, id_map):
+    return [[id_map[node] for node in route] for route in routes]
@@ -0,0 +1,127 @@
+# route_state.py
+# This file contains the solution state shared by our improvement engines
+# (alns.py and tabu_search.py). Route costs, loads and family visits are
+# updated with every change, so we never have to recompute a whole solution.
+
+
+# Cost of the arc between two nodes (the diagonal of the matrix is -1, so a
+# depot-to-depot "arc" of an empty route has to count as zero)
+def arc_cost(model, a, b):
+    if a == b:
+        return 0
+    return model.cost_matrix[a][b]
+
+
+# Function to calculate the cost of a single route
+def route_cost(model, route):
+    return sum(arc_cost(model, route[i], route[i + 1]) for i in range(len(route) - 1))
+
+
+# Cost change of putting node between route[pos - 1] and route[pos]
+def insertion_cost(model, route, pos, node):
+    prev_node = route[pos - 1]
+    next_node = route[pos]
+    return arc_cost(model, prev_node, node) + arc_cost(model, node, next_node) - arc_cost(model, prev_node, next_node)
+
+
+# Cost change of taking route[pos] out of the route (negative means we save)
+def removal_cost(model, route, pos):
+    prev_node = route[pos - 1]
+    node = route[pos]
+    next_node = route[pos + 1]
+    return arc_cost(model, prev_node, next_node) - arc_cost(model, prev_node, node) - arc_cost(model, node, next_node)
+
+
+# Routes together with their costs, loads and family visits
+class RouteState:
+    def __init__(self, model, routes):
+        self.model = model
+        self.routes = [route.copy() for route in routes]
+        # Use every vehicle we have, empty routes are just [0, 0]
+        while len(self.routes) < model.vehicles:
+            self.routes.append([0, 0])
+        self.costs = [route_cost(model, route) for route in self.routes]
+        self.loads = [sum(model.nodes[node].demand for node in route[1:-1]) for route in self.routes]
+        self.family_visits = [0] * model.num_fam
+        self.visited = set()
+        for route in self.routes:
+            for node in route[1:-1]:
+                self.family_visits[model.nodes[node].family] += 1
+                self.visited.add(node)
+        self.cost = sum(self.costs)
+
+    def copy(self):
+        new_state = type(self).__new__(type(self))
+        new_state.model = self.model
+        new_state.routes = [route.copy() for route in self.routes]
+        new_state.costs = self.costs.copy()
+        new_state.loads = self.loads.copy()
+        new_state.family_visits = self.family_visits.copy()
+        new_state.visited = self.visited.copy()
+        new_state.cost = self.cost
+        return new_state
+
+    # Called whenever route route_idx changes, subclasses can use it to keep
+    # their own caches up to date
+    def touch(self, route_idx):
+        pass
+
+    # Remove the node at position pos of route route_idx
+    def remove(self, route_idx, pos):
+        route = self.routes[route_idx]
+        node = route[pos]
+        delta = removal_cost(self.model, route, pos)
+        del route[pos]
+        self.touch(route_idx)
+        self.costs[route_idx] += delta
+        self.cost += delta
+        self.loads[route_idx] -= self.model.nodes[node].demand
+        self.family_visits[self.model.nodes[node].family] -= 1
+        self.visited.discard(node)
+        return node
+
+    # Insert node before position pos of route route_idx
+    def insert(self, route_idx, pos, node):
+        route = self.routes[route_idx]
+        delta = insertion_cost(self.model, route, pos, node)
+        route.insert(pos, node)
+        self.touch(route_idx)
+        self.costs[route_idx] += delta
+        self.cost += delta
+        self.loads[route_idx] += self.model.nodes[node].demand
+        self.family_visits[self.model.nodes[node].family] += 1
+        self.visited.add(node)
+
+    # Reverse route[i..j] (a 2-opt move inside one route)
+    def reverse(self, route_idx, i, j):
+        route = self.routes[route_idx]
+        a, b = route[i - 1], route[j + 1]
+        delta = (arc_cost(self.model, a, route[j]) + arc_cost(self.model, route[i], b)
+                 - arc_cost(self.model, a, route[i]) - arc_cost(self.model, route[j], b))
+        route[i:j + 1] = route[i:j + 1][::-1]
+        self.touch(route_idx)
+        self.costs[route_idx] += delta
+        self.cost += delta
+
+    # Remove a list of nodes wherever they are in the routes
+    def remove_nodes(self, nodes):
+        for node in nodes:
+            for route_idx, route in enumerate(self.routes):
+                if node in route:
+                    self.remove(route_idx, route.index(node))
+                    break
+
+    # Families that still need visits
+    def deficient_families(self):
+        return [family.id for family in self.model.families
+                if self.family_visits[family.id] < family.required_visits]
+
+    # All (route_idx, pos, node) we could remove, i.e. every visited customer
+    def positions(self):
+        return [(route_idx, pos, route[pos])
+                for route_idx, route in enumerate(self.routes)
+                for pos in range(1, len(route) - 1)]
+
+    # Final routes without the empty ones
+    def solution(self):
+        return [route.copy() for route in self.routes if len(route) > 2]
@@ -0,0 +1,201 @@
+# tabu_search.py
+# This file contains a granular tabu search for the F-CVRP
+# Unlike local_search in Solution.py it always makes the best move it can find,
+# even if that move makes the solution worse, and it remembers recent moves so
+# it does not simply undo them. That way it can keep searching for the whole
+# time budget instead of stopping at the first local optimum.
+# Only moves that create short arcs are tried (granular neighbourhood), and tabu
+# status is kept in dictionaries so checking a move is O(1).
+
+import random
+import time
+from route_state import RouteState, arc_cost
+
+
+# For every node, the set of nodes it is connected to by a "short" arc. An arc
+# is short if it costs at most beta times the average arc of the start solution.
+def granular_neighbours(model, state, beta):
+    num_arcs = sum(len(route) - 1 for route in state.routes if len(route) > 2)
+    threshold = beta * state.cost / max(1, num_arcs)
+    neighbours = []
+    for u in range(len(model.nodes)):
+        neighbours.append({v for v in range(len(model.nodes))
+                           if v != u and model.cost_matrix[u][v] <= threshold})
+        # We always allow arcs to and from the depot so routes can start anywhere
+        neighbours[u].add(0)
+    return neighbours
+
+
+# Where every visited customer is: node -> (route index, position)
+def node_positions(state):
+    positions = {}
+    for route_idx, route in enumerate(state.routes):
+        for pos in range(1, len(route) - 1):
+            positions[route[pos]] = (route_idx, pos)
+    return positions
+
+
+# Cost change of replacing route[pos] with node
+def replace_cost(model, route, pos, node):
+    prev_node = route[pos - 1]
+    next_node = route[pos + 1]
+    return (arc_cost(model, prev_node, node) + arc_cost(model, node, next_node)
+            - arc_cost(model, prev_node, route[pos]) - arc_cost(model, route[pos], next_node))
+
+
+# Every move is a tuple (delta, kind, data, attributes) where attributes are
+# the tabu keys the move would break: (node, route) pairs for moves that put a
+# node in a route and arcs for 2-opt
+def generate_moves(model, state, neighbours, positions):
+    moves = []
+    routes = state.routes
+    capacity = model.capacity
+
+    for u, (r1, i) in positions.items():
+        route1 = routes[r1]
+        demand_u = model.nodes[u].demand
+        remove_delta = (arc_cost(model, route1[i - 1], route1[i + 1])
+                        - arc_cost(model, route1[i - 1], u) - arc_cost(model, u, route1[i + 1]))
+
+        for v in neighbours[u]:
+            if v == 0:
+                targets = [(r2, 0) for r2 in range(len(routes))]
+            elif v in positions:
+                targets = [positions[v]]
+            else:
+                continue
+
+            for r2, j in targets:
+                route2 = routes[r2]
+
+                # Relocate: move u right after v, creating the short arc (v, u)
+                same_place = r1 == r2 and (j == i or j == i - 1)
+                fits = r1 == r2 or state.loads[r2] + demand_u <= capacity
+                if not same_place and fits:
+                    succ = route2[j + 1]
+                    delta = (remove_delta + arc_cost(model, route2[j], u)
+                             + arc_cost(model, u, succ) - arc_cost(model, route2[j], succ))
+                    moves.append((delta, "relocate", (u, r1, r2, j), [("visit", u, r2)]))
+
+                # Swap: exchange u with the node after v in another route, so
+                # u ends up right after v
+                if r1 != r2 and j + 1 < len(route2) - 1:
+                    w = route2[j + 1]
+                    demand_w = model.nodes[w].demand
+                    if (state.loads[r1] - demand_u + demand_w <= capacity
+                            and state.loads[r2] - demand_w + demand_u <= capacity):
+                        delta = replace_cost(model, route1, i, w) + replace_cost(model, route2, j + 1, u)
+                        moves.append((delta, "swap", (u, w), [("visit", u, r2), ("visit", w, r1)]))
+
+        # Exchange: visit another member of the same family instead of u
+        # (same demand, so the load does not change)
+        for member in model.families[model.nodes[u].family].nodes:
+            x = member.id
+            if x in positions or (x not in neighbours[route1[i - 1]] and x not in neighbours[route1[i + 1]]):
+                continue
+            delta = replace_cost(model, route1, i, x)
+            moves.append((delta, "exchange", (u, x), [("visit", x, r1)]))
+
+    # 2-opt: reverse route[i..j] when the new arc (route[i - 1], route[j]) is short
+    for route_idx, route in enumerate(routes):
+        for i in range(1, len(route) - 2):
+            a = route[i - 1]
+            for j in range(i + 1, len(route) - 1):
+                # Reversing the whole route does not change anything
+                if route[j] not in neighbours[a] or (i == 1 and j == len(route) - 2):
+                    continue
+                b = route[j + 1]
+                delta = (arc_cost(model, a, route[j]) + arc_cost(model, route[i], b)
+                         - arc_cost(model, a, route[i]) - arc_cost(model, route[j], b))
+                moves.append((delta, "2opt", (route_idx, i, j),
+                              [("arc", min(a, route[j]), max(a, route[j])),
+                               ("arc", min(route[i], b), max(route[i], b))]))
+
+    return moves
+
+
+# Apply a move to the state and return the tabu keys it creates, i.e. the
+# attributes that would undo it
+def apply_move(model, state, kind, data, positions):
+    if kind == "relocate":
+        u, r1, r2, j = data
+        pos_u = positions[u][1]
+        v = state.routes[r2][j]
+        state.remove(r1, pos_u)
+        pos_v = 0 if v == 0 else state.routes[r2].index(v)
+        state.insert(r2, pos_v + 1, u)
+        return [("visit", u, r1)]
+
+    if kind == "swap":
+        u, w = data
+        r1, i = positions[u]
+        r2, j = positions[w]
+        state.remove(r1, i)
+        state.insert(r1, i, w)
+        state.remove(r2, j)
+        state.insert(r2, j, u)
+        return [("visit", u, r1), ("visit", w, r2)]
+
+    if kind == "exchange":
+        u, x = data
+        r, i = positions[u]
+        state.remove(r, i)
+        state.insert(r, i, x)
+        return [("visit", u, r)]
+
+    route_idx, i, j = data
+    route = state.routes[route_idx]
+    a, b = route[i - 1], route[j + 1]
+    removed = [("arc", min(a, route[i]), max(a, route[i])),
+               ("arc", min(route[j], b), max(route[j], b))]
+    state.reverse(route_idx, i, j)
+    return removed
+
+
+# Main tabu search function
+def tabu_search(model, routes, time_limit=5.0, beta=1.5, tenure_min=10, tenure_max=20, seed=42):
+    rng = random.Random(seed)
+    start_time = time.time()
+
+    current = RouteState(model, routes)
+    best = current.copy()
+    neighbours = granular_neighbours(model, current, beta)
+
+    # tabu key -> first iteration where the key is allowed again
+    tabu = {}
+
+    iteration = 0
+    while time.time() - start_time < time_limit:
+        iteration += 1
+        positions = node_positions(current)
+
+        # Best improvement: take the cheapest move that is not tabu, or that
+        # is tabu but gives a new best solution (aspiration)
+        moves = generate_moves(model, current, neighbours, positions)
+        if not moves:
+            # Nothing we can change, searching longer will not help
+            break
+
+        best_move = None
+        for move in moves:
+            delta, kind, data, attributes = move
+            if best_move is not None and delta >= best_move[0]:
+                continue
+            is_tabu = any(tabu.get(key, 0) > iteration for key in attributes)
+            if is_tabu and current.cost + delta >= best.cost:
+                continue
+            best_move = move
+
+        if best_move is None:
+            # Every move is tabu, so forget the tabu list and try again
+            tabu.clear()
+            continue
+
+        _, kind, data, _ = best_move
+        for key in apply_move(model, current, kind, data, positions):
+            tabu[key] = iteration + rng.randint(tenure_min, tenure_max)
+
+        if current.cost < best.cost:
+            best = current.copy()
+
+    return best.solution(), best.cost